@@ -4,12 +4,14 @@ import dashscope
 from dotenv import load_dotenv
 load_dotenv()
 
-def separate_content_types(chunk):
-    """Analyze what types of content are in a chunk"""
+def separate_content_types(chunk, dropped_image_ids=None):
+    """Analyze what types of content are in a chunk, skipping images removed by triage"""
+    dropped_image_ids = dropped_image_ids or set()
     content_data = {
         'text': chunk.text,
         'tables': [],
         'images': [],
+        'filtered_images': 0,
         'types': ['text']
     }
     
@@ -26,7 +28,9 @@ def separate_content_types(chunk):
             
             # Handle images
             elif element_type == 'Image':
-                if hasattr(element, 'metadata') and hasattr(element.metadata, 'image_base64'):
+                if element.id in dropped_image_ids:
+                    content_data['filtered_images'] += 1
+                elif hasattr(element, 'metadata') and hasattr(element.metadata, 'image_base64'):
                     content_data['types'].append('image')
                     content_data['images'].append(element.metadata.image_base64)
     
@@ -92,26 +96,29 @@ def create_ai_enhanced_summary(text: str, tables: list[str], images: list[str])
     except Exception as e:
         return f"AI 摘要生成失败: {str(e)}"
 
-def summarise_chunks(chunks):
+def summarise_chunks(chunks, dropped_image_ids=None):
     """Process all chunks with AI Summaries"""
     print("🧠 Processing chunks with AI Summaries...")
     
     langchain_documents = []
     total_chunks = len(chunks)
+    vlm_calls = 0
+    vlm_calls_avoided = 0
     
     for i, chunk in enumerate(chunks):
         current_chunk = i + 1
         print(f"   Processing chunk {current_chunk}/{total_chunks}")
         
         # Analyze chunk content
-        content_data = separate_content_types(chunk)
+        content_data = separate_content_types(chunk, dropped_image_ids)
         
         # Debug prints
         print(f"     Types found: {content_data['types']}")
-        print(f"     Tables: {len(content_data['tables'])}, Images: {len(content_data['images'])}")
+        print(f"     Tables: {len(content_data['tables'])}, Images: {len(content_data['images'])}, Filtered Images: {content_data['filtered_images']}")
         
         # Create AI-enhanced summary if chunk has tables/images
         if content_data['tables'] or content_data['images']:
+            vlm_calls += 1
             print(f"     → Creating AI summary for mixed content...")
             try:
                 enhanced_content = create_ai_enhanced_summary(
@@ -125,6 +132,9 @@ def summarise_chunks(chunks):
                 print(f"     ❌ AI summary failed: {e}")
                 enhanced_content = content_data['text']
         else:
+            if content_data['filtered_images']:
+                # 只因被分诊丢弃的图片才会触发的 VLM 调用
+                vlm_calls_avoided += 1
             print(f"     → Using raw text (no tables/images)")
             enhanced_content = content_data['text']
         
@@ -143,6 +153,8 @@ def summarise_chunks(chunks):
         langchain_documents.append(doc)
     
     print(f"✅ Processed {len(langchain_documents)} chunks")
+    print(f"   - VLM Calls Made:    {vlm_calls}")
+    print(f"   - VLM Calls Avoided: {vlm_calls_avoided}")
     return langchain_documents
 
 
@@ -1,5 +1,7 @@
 import json
 from unstructured.chunking.title import chunk_by_title
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,4 +18,50 @@ def create_chunks_by_title(elements):
     )
     
     print(f"✅ Created {len(chunks)} chunks")
-    return chunks
\ No newline at end of file
+    return chunks
+
+def create_child_chunks(parent_records, chunk_size=400):
+    """把父级标题分块再切成小段子块（small-to-big），每个子块记录所属父块的 chunk_id
+
+    原文子块带 child_index 记录原文顺序；父块的增强摘要额外作为一个 is_summary 子块，
+    保证针对图片/表格内容的提问仍能命中。
+
+    parent_records 即 export_chunks_to_json 导出的记录列表，
+    因此可以直接基于已有的 summarised_chunks.json 建子索引，无需重新生成摘要。
+    """
+    print("🔨 Creating child chunks...")
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, # 子块足够小，让向量只表达一个要点
+        chunk_overlap=0, # 不重叠，命中的相邻兄弟子块可以直接拼回原文
+        separators=["\n\n", "\n", "。", "！", "？", "；", "，", " ", ""],
+    )
+
+    child_documents = []
+    for record in parent_records:
+        original_content = record["metadata"]["original_content"]
+        raw_text = original_content.get("raw_text", "") if isinstance(original_content, dict) else ""
+
+        for child_index, passage in enumerate(splitter.split_text(raw_text)):
+            child_documents.append(Document(
+                page_content=passage,
+                metadata={
+                    "parent_id": record["chunk_id"],
+                    "child_index": child_index,
+                    "is_summary": False,
+                }
+            ))
+
+        # 含图表的父块，其 enhanced_content 是 VLM 生成的描述，原文里没有，单独作为一个摘要子块入索引
+        enhanced_content = record.get("enhanced_content", "")
+        if enhanced_content and enhanced_content != raw_text:
+            child_documents.append(Document(
+                page_content=enhanced_content,
+                metadata={
+                    "parent_id": record["chunk_id"],
+                    "is_summary": True,
+                }
+            ))
+
+    print(f"✅ Created {len(child_documents)} child chunks from {len(parent_records)} parents")
+    return child_documents
@@ -0,0 +1,111 @@
+import base64
+import io
+import numpy as np
+from PIL import Image as PILImage
+
+
+def _decode_image(image_base64: str):
+    """把 base64（可带 data: 前缀）解码成 PIL 图片，失败返回 None"""
+    if "," in image_base64:
+        image_base64 = image_base64.split(",")[-1]
+    try:
+        img = PILImage.open(io.BytesIO(base64.b64decode(image_base64)))
+        # open 是惰性的，load 才会真正解码像素，截断/损坏的图片在这里就会报错
+        img.load()
+        return img
+    except Exception:
+        return None
+
+
+def dhash(img, hash_size=8) -> int:
+    """差值感知哈希 (dHash)：缩成 (hash_size+1) x hash_size 灰度图，比较相邻像素明暗得到 64 位指纹"""
+    pixels = np.asarray(
+        img.convert("L").resize((hash_size + 1, hash_size), PILImage.Resampling.LANCZOS),
+        dtype=np.int16,
+    )
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def image_entropy(img) -> float:
+    """灰度直方图的香农熵（bit），纯色块、细线、简单图标的熵很低"""
+    histogram = np.asarray(img.convert("L").histogram(), dtype=np.float64)
+    probs = histogram[histogram > 0] / histogram.sum()
+    return float(-(probs * np.log2(probs)).sum())
+
+
+def triage_images(
+    chunks,
+    min_side=32, # 任一边小于 32px 视为装饰性小图标
+    min_area=64 * 64, # 面积太小的图片不值得一次 VLM 调用
+    max_decorative_area=200 * 200, # 只有小于该面积的图片才做熵检测，大图（流程图、截图）不受影响
+    min_entropy=0.2, # 接近 0 的熵只对应纯色块/分割线，黑白线稿（约 0.5 bit）不会被误删
+    max_hamming=5, # dHash 汉明距离 <= 5 视为近似重复
+    max_page_frequency=3, # 同一张图出现在 >= 3 个页面上，视为页眉/logo
+):
+    """在摘要之前对整份文档的图片做分诊，返回应丢弃的 Image 元素 id 集合
+
+    - 尺寸/熵过滤：小图标直接丢弃；面积较小且几乎纯色的装饰图丢弃
+    - 感知哈希：近似重复的图片只保留第一次出现的那张
+    - 文档内频率：在很多页面上重复出现的图片（logo、页眉）全部丢弃
+    """
+    print("🖼️ Triaging images before summarisation...")
+
+    clusters = [] # 每个元素: {"hash": int, "element_ids": [...], "pages": set()}
+    dropped_ids = set()
+    stats = {"total": 0, "too_small": 0, "low_entropy": 0, "frequent": 0, "duplicate": 0}
+
+    for chunk in chunks:
+        if not (hasattr(chunk, 'metadata') and hasattr(chunk.metadata, 'orig_elements')):
+            continue
+        for element in chunk.metadata.orig_elements or []:
+            if type(element).__name__ != 'Image':
+                continue
+            image_base64 = getattr(element.metadata, 'image_base64', None)
+            if not image_base64:
+                continue
+            stats["total"] += 1
+
+            img = _decode_image(image_base64)
+            if img is None:
+                # 解码失败时保守处理：保留，交给 VLM
+                continue
+
+            width, height = img.size
+            if min(width, height) < min_side or width * height < min_area:
+                stats["too_small"] += 1
+                dropped_ids.add(element.id)
+                continue
+
+            try:
+                if width * height < max_decorative_area and image_entropy(img) < min_entropy:
+                    stats["low_entropy"] += 1
+                    dropped_ids.add(element.id)
+                    continue
+                image_hash = dhash(img)
+            except Exception:
+                # 分析失败同样保守处理：保留，交给 VLM
+                continue
+            page = getattr(element.metadata, 'page_number', None)
+            for cluster in clusters:
+                if bin(cluster["hash"] ^ image_hash).count("1") <= max_hamming:
+                    cluster["element_ids"].append(element.id)
+                    cluster["pages"].add(page)
+                    break
+            else:
+                clusters.append({"hash": image_hash, "element_ids": [element.id], "pages": {page}})
+
+    for cluster in clusters:
+        if len(cluster["pages"]) >= max_page_frequency:
+            stats["frequent"] += len(cluster["element_ids"])
+            dropped_ids.update(cluster["element_ids"])
+        else:
+            stats["duplicate"] += len(cluster["element_ids"]) - 1
+            dropped_ids.update(cluster["element_ids"][1:])
+
+    print(f"✅ Image triage complete: kept {stats['total'] - len(dropped_ids)}/{stats['total']} images")
+    print(f"   - Too Small:      {stats['too_small']}")
+    print(f"   - Low Entropy:    {stats['low_entropy']}")
+    print(f"   - Repeated Pages: {stats['frequent']}")
+    print(f"   - Near-Duplicate: {stats['duplicate']}")
+    return dropped_ids
@@ -1,5 +1,6 @@
 import os
 import sys
+import json
 
 # 把当前目录加入 Python 路径，防止找不到模块
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -8,13 +9,22 @@ sys.dont_write_bytecode = True
 
 # 导入你拆分的四个模块
 from partition import partition_document
-from chunk import create_chunks_by_title
+from chunk import create_chunks_by_title, create_child_chunks
+from image_triage import triage_images
 from LLM_summar import summarise_chunks
-from vector_store import create_vector_store
+from vector_store import create_vector_store, create_child_vector_store, reset_collection
 from utils import export_chunks_to_json
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir) # 回退到 feishu-rag-demo/
+json_path = os.path.join(project_root, "data", "summarised_chunks.json")
+
 def run_ingestion(pdf_path, db_path="vector_db/chroma_db"):
     """
-    一键执行完整的数据入库流水线：拆分 -> 分块 -> 总结 -> 入库
+    一键执行完整的数据入库流水线：拆分 -> 分块 -> 图片分诊 -> 总结 -> 入库 -> 子块索引
+
+    向量库只承载一份文档：chunk_id 是文档内的序号，summarised_chunks.json 也只有一份，
+    所以每次入库都会清空旧的父块和子块索引，保证 flat 与 hierarchical 两种检索看到同一份数据。
     """
     print("\n Starting RAG Ingestion Pipeline")
     print("=" * 50)
@@ -29,29 +39,53 @@ def run_ingestion(pdf_path, db_path="vector_db/chroma_db"):
     chunks = create_chunks_by_title(elements)
     print(f"✅ Created {len(chunks)} chunks.")
 
+    # --- Step 2.5: Image Triage ---
+    print(f"\n[2.5/4] Filtering logos, icons and duplicate images...")
+    dropped_image_ids = triage_images(chunks)
+
     # --- Step 3: AI Summarisation ---
     print(f"\n[3/4] Generating AI Summaries (This may take a while)...")
-    summarised_chunks = summarise_chunks(chunks)
+    summarised_chunks = summarise_chunks(chunks, dropped_image_ids)
     print(f"✅ Summarised {len(summarised_chunks)} chunks.")
 
     # +++ 新增的步骤：导出为 JSON 存档 +++
     print(f"\n[3.5/4] Exporting to JSON for inspection...")
-    # 建议把 json 保存在 data 目录下
-    json_path = os.path.join(project_root, "data", "summarised_chunks.json")
-    export_chunks_to_json(summarised_chunks, filename=json_path)
+    # 建议把 json 保存在 data 目录下，它同时也是检索时按 parent_id 回查父块的 parent store
+    parent_records = export_chunks_to_json(summarised_chunks, filename=json_path)
     
     # --- Step 4: Vector Store ---
     print(f"\n[4/4] Creating Vector Store at: {db_path}...")
+    reset_collection(db_path)
     db = create_vector_store(summarised_chunks, persist_directory=db_path)
     print(f"✅ Vector Store successfully created!")
 
+    # --- Step 4.5: Child Index (small-to-big) ---
+    print(f"\n[4.5/4] Creating Child Index...")
+    child_chunks = create_child_chunks(parent_records)
+    create_child_vector_store(child_chunks, persist_directory=db_path)
+
     print("\n🎉 Pipeline completed successfully!")
     return db
 
+def run_child_indexing(parents_json=json_path, db_path="vector_db/chroma_db"):
+    """
+    只基于已导出的 summarised_chunks.json 重建子块索引，不重新拆分 PDF、也不重新调用 VLM 生成摘要
+    """
+    print(f"\n Building Child Index from: {parents_json}")
+    with open(parents_json, 'r', encoding='utf-8') as f:
+        parent_records = json.load(f)
+
+    child_chunks = create_child_chunks(parent_records)
+    db = create_child_vector_store(child_chunks, persist_directory=db_path)
+    print("\n🎉 Child index completed successfully!")
+    return db
+
 if __name__ == "__main__":
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(current_dir) # 回退到 feishu-rag-demo/
-    pdf_path = os.path.join(project_root, "doc", "视觉全流程指南.pdf")
-    print(f"检查文件路径: {pdf_path}") 
-    # 执行流水线
-    run_ingestion(pdf_path)
\ No newline at end of file
+    # python src/ingestion_pipeline.py --children-only  只给已有的父块补建子块索引
+    if "--children-only" in sys.argv:
+        run_child_indexing()
+    else:
+        pdf_path = os.path.join(project_root, "doc", "视觉全流程指南.pdf")
+        print(f"检查文件路径: {pdf_path}") 
+        # 执行流水线
+        run_ingestion(pdf_path)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
 import json
+import time
 from typing import Tuple, List
 from dotenv import load_dotenv
 from loguru import logger
@@ -17,6 +18,16 @@ dashscope.api_key = api_key
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "vector_db", "chroma_db")
+PARENT_STORE_PATH = os.path.join(BASE_DIR, "data", "summarised_chunks.json")
+CHILD_COLLECTION_NAME = "child_chunks" # 与 vector_store.CHILD_COLLECTION_NAME 保持一致
+
+# hierarchical: 检索小子块再按预算扩展回父块；flat: 直接检索父块摘要（旧逻辑）
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hierarchical")
+CHILD_TOP_K = int(os.getenv("CHILD_TOP_K", "6"))
+CONTEXT_CHAR_BUDGET = int(os.getenv("CONTEXT_CHAR_BUDGET", "4000"))
+# 图片比文字贵得多：每张图按 IMAGE_CHAR_COST 个字符计入预算，且总数不超过 MAX_CONTEXT_IMAGES
+IMAGE_CHAR_COST = int(os.getenv("IMAGE_CHAR_COST", "1000"))
+MAX_CONTEXT_IMAGES = int(os.getenv("MAX_CONTEXT_IMAGES", "3"))
 
 
 embeddings = DashScopeEmbeddings(model="text-embedding-v3")
@@ -27,6 +38,115 @@ except Exception as e:
     logger.error(f"❌ 连接 ChromaDB 失败: {e}")
     vector_store = None
 
+child_store = None
+parent_store = {}
+if RETRIEVAL_MODE == "hierarchical":
+    try:
+        child_store = Chroma(
+            persist_directory=DB_PATH,
+            embedding_function=embeddings,
+            collection_name=CHILD_COLLECTION_NAME,
+        )
+        # Chroma(...) 会自动创建空 collection，没跑过子块建索引时这里是空的，需要主动回退
+        if child_store._collection.count() == 0:
+            raise ValueError(f"collection {CHILD_COLLECTION_NAME} 为空，请先运行 ingestion_pipeline.py --children-only")
+        with open(PARENT_STORE_PATH, 'r', encoding='utf-8') as f:
+            parent_store = {record["chunk_id"]: record for record in json.load(f)}
+        logger.info(f"✅ 成功加载子块索引与 {len(parent_store)} 个父块！")
+    except Exception as e:
+        logger.warning(f"⚠️ 子块索引不可用，回退到 flat 检索: {e}")
+        child_store = None
+
+
+def _collect_images(meta: dict, message_content: list, all_images_base64: list):
+    """把父块的图片组装成原生 SDK 要求的格式，同时收集给飞书"""
+    for img_b64 in meta.get("images_base64", []):
+        # 清洗确保有正确前缀
+        clean_b64 = img_b64.split(",")[-1] if "," in img_b64 else img_b64
+        fixed_img = f"data:image/jpeg;base64,{clean_b64}"
+        
+        # 加入模型上下文
+        message_content.append({"image": fixed_img})
+        # 存入列表交回给飞书
+        all_images_base64.append(clean_b64)
+
+
+def _merge_sibling_passages(children) -> str:
+    """把同一父块下命中的子块按原文顺序拼接，连续的兄弟子块直接相连，有间隔的用省略号隔开
+
+    命中的父块摘要子块（图表/表格的 VLM 描述）不属于原文顺序，附在原文片段之后。
+    """
+    summaries = [c.page_content for c in children if c.metadata.get("is_summary")]
+    passages = sorted(
+        (c for c in children if not c.metadata.get("is_summary")),
+        key=lambda c: c.metadata["child_index"],
+    )
+
+    merged = passages[0].page_content if passages else ""
+    for prev, child in zip(passages, passages[1:]):
+        gap = child.metadata["child_index"] - prev.metadata["child_index"]
+        merged += ("" if gap == 1 else "\n……\n") + child.page_content
+    if summaries:
+        merged += ("\n" if merged else "") + "内容摘要：\n" + "\n".join(summaries)
+    return merged
+
+
+def _build_flat_context(query: str, message_content: list, all_images_base64: list) -> str:
+    """旧逻辑：直接召回父块，整块送入模型"""
+    chunks = vector_store.similarity_search(query, k=2)
+    
+    prompt_text = ""
+    for i, chunk in enumerate(chunks):
+        prompt_text += f"--- 分块 {i+1} ---\n"
+        
+        if "original_content" in chunk.metadata:
+            try:
+                meta = json.loads(chunk.metadata["original_content"])
+                prompt_text += f"文字内容：\n{meta.get('raw_text', '')}\n"
+                _collect_images(meta, message_content, all_images_base64)
+            except json.JSONDecodeError:
+                prompt_text += f"{chunk.page_content}\n"
+        else:
+            prompt_text += f"{chunk.page_content}\n"
+    return prompt_text
+
+
+def _build_hierarchical_context(query: str, message_content: list, all_images_base64: list) -> str:
+    """small-to-big：召回子块 -> 按父块分组合并兄弟子块 -> 在字符预算内尽量扩展为完整父块"""
+    children = child_store.similarity_search(query, k=CHILD_TOP_K)
+    if not children:
+        logger.warning("⚠️ 子块索引未命中，回退到 flat 检索")
+        return _build_flat_context(query, message_content, all_images_base64)
+    
+    # 按父块首次命中的排名分组，同一父块的多个命中合并成一组
+    hits_by_parent = {}
+    for child in children:
+        hits_by_parent.setdefault(child.metadata["parent_id"], []).append(child)
+
+    prompt_text = ""
+    remaining = CONTEXT_CHAR_BUDGET
+    for i, (parent_id, hits) in enumerate(hits_by_parent.items()):
+        parent = parent_store.get(parent_id)
+        meta = parent["metadata"]["original_content"] if parent else {}
+        raw_text = meta.get("raw_text", "")
+        images = meta.get("images_base64", [])
+        parent_cost = len(raw_text) + len(images) * IMAGE_CHAR_COST
+
+        # 文字和图片都放得下才扩展为完整父块，否则只放命中的子块（不带图片）
+        fits_images = len(all_images_base64) + len(images) <= MAX_CONTEXT_IMAGES
+        if raw_text and parent_cost <= remaining and fits_images:
+            section = raw_text
+            _collect_images(meta, message_content, all_images_base64)
+            remaining -= len(images) * IMAGE_CHAR_COST
+        else:
+            section = _merge_sibling_passages(hits)
+
+        if len(section) > remaining and prompt_text:
+            continue
+        prompt_text += f"--- 分块 {i+1} ---\n文字内容：\n{section}\n"
+        remaining -= len(section)
+    return prompt_text
+
 
 def get_answer(query: str) -> Tuple[str, List[str]]:
     """使用阿里原生 MultiModalConversation 接口生成回答"""
@@ -34,43 +154,28 @@ def get_answer(query: str) -> Tuple[str, List[str]]:
         return "抱歉，向量数据库未初始化。", []
 
     logger.info(f"🔍 正在检索问题: {query}")
-    
-    chunks = vector_store.similarity_search(query, k=2)
-    
-    if not chunks:
-        return "抱歉，知识库中未找到相关内容。", []
+    start_time = time.perf_counter()
 
     try:
-        prompt_text = f"请使用上述文本、表格和图片，提供清晰、全面的答案。如果文档中没有足够的信息来回答该问题，请说明：“根据提供的文档，我没有足够的信息来回答这个问题{query}\n\n内容：\n"
         message_content = []
         all_images_base64 = [] # 用于交给 main.py 上传飞书
-        
-        for i, chunk in enumerate(chunks):
-            prompt_text += f"--- 分块 {i+1} ---\n"
-            
-            if "original_content" in chunk.metadata:
-                try:
-                    meta = json.loads(chunk.metadata["original_content"])
-                    prompt_text += f"文字内容：\n{meta.get('raw_text', '')}\n"
-                    
-                    # 处理图片：组装成原生 SDK 要求的格式
-                    for img_b64 in meta.get("images_base64", []):
-                        # 清洗确保有正确前缀
-                        clean_b64 = img_b64.split(",")[-1] if "," in img_b64 else img_b64
-                        fixed_img = f"data:image/jpeg;base64,{clean_b64}"
-                        
-                        # 加入模型上下文
-                        message_content.append({"image": fixed_img})
-                        # 存入列表交回给飞书
-                        all_images_base64.append(clean_b64)
-                except json.JSONDecodeError:
-                    prompt_text += f"{chunk.page_content}\n"
-            else:
-                prompt_text += f"{chunk.page_content}\n"
+
+        if child_store is not None:
+            context_text = _build_hierarchical_context(query, message_content, all_images_base64)
+        else:
+            context_text = _build_flat_context(query, message_content, all_images_base64)
+
+        if not context_text:
+            return "抱歉，知识库中未找到相关内容。", []
+
+        prompt_text = f"请使用上述文本、表格和图片，提供清晰、全面的答案。如果文档中没有足够的信息来回答该问题，请说明：“根据提供的文档，我没有足够的信息来回答这个问题{query}\n\n内容：\n"
+        prompt_text += context_text
 
         # 将 Prompt 文本插入到消息数组的首位 (和你的前端逻辑一模一样)
         message_content.insert(0, {"text": prompt_text})
 
+        retrieval_seconds = time.perf_counter() - start_time
+        logger.info(f"📏 Prompt 规模: {len(prompt_text)} 字符, {len(all_images_base64)} 张图片 (检索模式: {'hierarchical' if child_store is not None else 'flat'})")
         logger.info("🧠 正在通过阿里原生多模态 SDK 呼叫 Qwen3-VL-Plus...")
         
         # 🚨 核心改动：使用能 100% 跑通的原生调用方式
@@ -83,7 +188,8 @@ def get_answer(query: str) -> Tuple[str, List[str]]:
         if response.status_code == 200:
             # 拿到最终的文字回答
             answer = response.output.choices[0].message.content[0]['text']
-            logger.info("✅ 原生接口调用成功，回答已生成！")
+            total_seconds = time.perf_counter() - start_time
+            logger.info(f"✅ 原生接口调用成功，回答已生成！检索 {retrieval_seconds:.2f}s, 总耗时 {total_seconds:.2f}s")
             return answer, all_images_base64
         else:
             logger.error(f"❌ 阿里云接口报错: {response.code} - {response.message}")
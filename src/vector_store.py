@@ -2,7 +2,10 @@ from langchain_dashscope import DashScopeEmbeddings
 from langchain_community.vectorstores import Chroma
 import time
 
-def create_vector_store(documents, persist_directory="dbv1/chroma_db"):
+# 子块（small-to-big）索引单独放一个 collection，和父块摘要索引共用同一个持久化目录
+CHILD_COLLECTION_NAME = "child_chunks"
+
+def create_vector_store(documents, persist_directory="dbv1/chroma_db", collection_name="langchain"):
     """分批创建并持久化 ChromaDB 向量库"""
     print(f"🔮 开始处理 {len(documents)} 个文档，采用分批处理模式...")
     
@@ -26,6 +29,7 @@ def create_vector_store(documents, persist_directory="dbv1/chroma_db"):
                     documents=batch,
                     embedding=embedding_model,
                     persist_directory=persist_directory,
+                    collection_name=collection_name,
                     collection_metadata={"hnsw:space": "cosine"}
                 )
             else:
@@ -41,4 +45,27 @@ def create_vector_store(documents, persist_directory="dbv1/chroma_db"):
             continue
 
     print(f"✅ 所有批次处理完成，向量库已保存至 {persist_directory}")
-    return vectorstore
\ No newline at end of file
+    return vectorstore
+
+def reset_collection(persist_directory="dbv1/chroma_db", collection_name="langchain"):
+    """删除已有的 collection，避免重复入库时 from_documents 在旧数据上继续追加"""
+    embedding_model = DashScopeEmbeddings(model="text-embedding-v3")
+    try:
+        Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embedding_model,
+            collection_name=collection_name,
+        ).delete_collection()
+        print(f"🧹 已清空旧的索引 {collection_name}")
+    except Exception as e:
+        print(f"⚠️ 清空旧索引 {collection_name} 失败（可能尚不存在）: {e}")
+
+def create_child_vector_store(child_documents, persist_directory="dbv1/chroma_db"):
+    """重建子块索引：先清空旧的子块 collection，再分批写入，父块索引保持不动"""
+    reset_collection(persist_directory, collection_name=CHILD_COLLECTION_NAME)
+
+    return create_vector_store(
+        child_documents,
+        persist_directory=persist_directory,
+        collection_name=CHILD_COLLECTION_NAME,
+    )